@@ -8,7 +8,7 @@ from pathlib import Path
 # Import your existing modules
 from src.config import Config
 from src.embeddings import DocumentEmbedder
-from src.llm_query import query as rag_query
+from src.llm_query import query as rag_query, warm_up
 from src.get_vector_db import get_vector_db
 import random
 import time
@@ -26,6 +26,7 @@ if 'embedder' not in st.session_state:
     with st.spinner("Initializing RAG system..."):
         st.session_state.embedder = DocumentEmbedder(config)
         st.session_state.vector_db = get_vector_db()
+        warm_up()
 if 'processing_status' not in st.session_state:
     st.session_state.processing_status = None
 
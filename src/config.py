@@ -2,17 +2,77 @@
 import os
 from dataclasses import dataclass
 
+def default_ollama_url() -> str:
+    # Follow OLLAMA_HOST like the Ollama client does, e.g. "0.0.0.0:11434" or "https://ollama.example.com"
+    host = os.getenv("OLLAMA_HOST", "localhost:11434")
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.rstrip("/")
+
 @dataclass
 class Config:
     # File paths
     NEXTCLOUD_PATH: str = os.getenv("NEXTCLOUD_PATH", "/home/deck/Documents/Books")
     
     # Model settings
+    OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", default_ollama_url())
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "qwen3:0.6b")
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-minilm")
+    # "ollama" or "onnx" (in-process int8 MiniLM)
+    EMBED_BACKEND: str = os.getenv("EMBED_BACKEND", "ollama")
+    ONNX_MODEL: str = os.getenv("ONNX_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    ONNX_MODEL_PATH: str = os.getenv("ONNX_MODEL_PATH", "./onnx_model")
+    
+    # Chunking, measured in tokens of SPLITTER_TOKENIZER; CHUNK_SIZE includes special tokens
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "256"))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "32"))
+    SPLITTER_TOKENIZER: str = os.getenv("SPLITTER_TOKENIZER", "sentence-transformers/all-MiniLM-L6-v2")
+    
+    # Ingestion
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "128"))
+    # Embedding requests kept in flight against Ollama
+    EMBED_CONCURRENCY: int = int(os.getenv("EMBED_CONCURRENCY", "8"))
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+    # "process" or "thread" (use threads if unstructured spawns its own subprocesses)
+    INGEST_EXECUTOR: str = os.getenv("INGEST_EXECUTOR", "process")
+    # unstructured strategy for PDFs without a text layer ("fast", "ocr_only" or "hi_res")
+    PDF_FALLBACK_STRATEGY: str = os.getenv("PDF_FALLBACK_STRATEGY", "fast")
+    
+    # Seconds get_file_stats results are reused for
+    STATS_CACHE_TTL: int = int(os.getenv("STATS_CACHE_TTL", "60"))
+    
+    # Webhook ingest queue
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", "2"))
+    WEBHOOK_QUEUE_SIZE: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+    # Files arriving within the flush window are ingested as one batch
+    WEBHOOK_BATCH_SIZE: int = int(os.getenv("WEBHOOK_BATCH_SIZE", "32"))
+    WEBHOOK_FLUSH_MS: int = int(os.getenv("WEBHOOK_FLUSH_MS", "500"))
+    
+    # Retrieval: over-fetch this many candidates and re-rank them exactly
+    # (0 disables, except for approximate FAISS indexes, which always re-rank 100)
+    RERANK_FETCH_K: int = int(os.getenv("RERANK_FETCH_K", "0"))
     
     # Collections
     DEFAULT_COLLECTION: str = os.getenv("COLLECTION_NAME", "documents")
     
+    # Vector store: "chroma" or "faiss"
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
+    EMBEDDING_DIM: int = int(os.getenv("EMBEDDING_DIM", "384"))
+    
     # ChromaDB
-    CHROMA_PATH: str = os.getenv("CHROMA_PATH", "./chroma_db")
\ No newline at end of file
+    CHROMA_PATH: str = os.getenv("CHROMA_PATH", "./chroma_db")
+    # "embedded" opens CHROMA_PATH in-process; "server" connects to a Chroma server
+    CHROMA_MODE: str = os.getenv("CHROMA_MODE", "embedded")
+    CHROMA_HOST: str = os.getenv("CHROMA_HOST", "localhost")
+    CHROMA_PORT: int = int(os.getenv("CHROMA_PORT", "8001"))
+    
+    # FAISS
+    FAISS_PATH: str = os.getenv("FAISS_PATH", "./faiss_index")
+    # Vector compression: "none" (float32), "sq8" (8-bit scalar) or "pq48" (48-byte product codes)
+    QUANTIZE: str = os.getenv("QUANTIZE", "pq48")
+    FAISS_NLIST: int = int(os.getenv("FAISS_NLIST", "1024"))
+    FAISS_NPROBE: int = int(os.getenv("FAISS_NPROBE", "16"))
+    # Explicit index_factory string; overrides QUANTIZE/FAISS_NLIST when set
+    FAISS_INDEX: str = os.getenv("FAISS_INDEX", "")
+    # Vectors held in an exact flat index before IVF/PQ training; at least 39 per IVF list
+    FAISS_TRAIN_SIZE: int = int(os.getenv("FAISS_TRAIN_SIZE", "10240"))
\ No newline at end of file
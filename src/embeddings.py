@@ -1,84 +1,409 @@
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pypdf import PdfReader
 from unstructured.partition.auto import partition
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from src.get_vector_db import get_vector_db
+from src.config import Config
+from src.get_vector_db import add_embeddings, delete_ids, get_embedding, get_vector_db, persist_vector_db
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+config = Config()
+
+# Supported file extensions by unstructured
+SUPPORTED_EXTENSIONS = frozenset({
+    '.pdf', '.docx', '.doc', '.txt', '.md', '.html', '.htm',
+    '.rtf', '.odt', '.csv', '.xlsx', '.xls', '.pptx', '.ppt'
+})
+
+def get_extension(name: str) -> str:
+    """Lowercased extension of a file name, matching Path.suffix semantics."""
+    return os.path.splitext(name)[1].lower()
+
+def iter_files(root: str) -> Iterator[os.DirEntry]:
+    """
+    Recursively yield every regular file under root using os.scandir.
+    DirEntry caches its type and stat results, so large trees need far fewer syscalls.
+    """
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError as e:
+            logger.warning(f"Could not scan directory: {str(e)}")
+
+def empty_file_stats() -> dict:
+    return {
+        "total_files": 0,
+        "supported_files": 0,
+        "file_types": {},
+        "total_size": 0
+    }
+
+def count_file(stats: dict, ext: str, stat: os.stat_result) -> None:
+    """Add one file to a file stats dict."""
+    stats["total_files"] += 1
+    stats["total_size"] += stat.st_size
+    
+    if ext in SUPPORTED_EXTENSIONS:
+        stats["supported_files"] += 1
+        stats["file_types"][ext] = stats["file_types"].get(ext, 0) + 1
+
+class FastSplitter(RecursiveCharacterTextSplitter):
+    """
+    RecursiveCharacterTextSplitter that compiles each separator regex once
+    instead of on every search/split call while recursing through a text.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._patterns: Dict[str, re.Pattern] = {}
+        for separator in self._separators:
+            if separator:
+                self._pattern(separator)
+    
+    def _pattern(self, separator: str) -> re.Pattern:
+        pattern = self._patterns.get(separator)
+        if pattern is None:
+            escaped = separator if self._is_separator_regex else re.escape(separator)
+            # The capturing group keeps delimiters in the split result, as the parent class does
+            pattern = re.compile(f"({escaped})" if self._keep_separator else escaped)
+            self._patterns[separator] = pattern
+        return pattern
+    
+    def _split_with_pattern(self, text: str, separator: str) -> List[str]:
+        """Same behaviour as langchain's _split_text_with_regex, using the cached pattern."""
+        if not separator:
+            return [s for s in text if s != ""]
+        
+        _splits = self._pattern(separator).split(text)
+        if not self._keep_separator:
+            return [s for s in _splits if s != ""]
+        
+        if self._keep_separator == "end":
+            splits = [_splits[i] + _splits[i + 1] for i in range(0, len(_splits) - 1, 2)]
+        else:
+            splits = [_splits[i] + _splits[i + 1] for i in range(1, len(_splits), 2)]
+        if len(_splits) % 2 == 0:
+            splits += _splits[-1:]
+        splits = (splits + [_splits[-1]]) if self._keep_separator == "end" else ([_splits[0]] + splits)
+        return [s for s in splits if s != ""]
+    
+    def _split_text(self, text: str, separators: List[str]) -> List[str]:
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = separators[-1]
+        new_separators = []
+        for i, _s in enumerate(separators):
+            if _s == "":
+                separator = _s
+                break
+            if self._pattern(_s).search(text):
+                separator = _s
+                new_separators = separators[i + 1:]
+                break
+        
+        splits = self._split_with_pattern(text, separator)
+        
+        # Now go merging things, recursively splitting longer texts.
+        _good_splits = []
+        _separator = "" if self._keep_separator else separator
+        for s in splits:
+            if self._length_function(s) < self._chunk_size:
+                _good_splits.append(s)
+            else:
+                if _good_splits:
+                    final_chunks.extend(self._merge_splits(_good_splits, _separator))
+                    _good_splits = []
+                if not new_separators:
+                    final_chunks.append(s)
+                else:
+                    final_chunks.extend(self._split_text(s, new_separators))
+        if _good_splits:
+            final_chunks.extend(self._merge_splits(_good_splits, _separator))
+        return final_chunks
+
+@lru_cache(maxsize=1)
+def get_text_splitter() -> FastSplitter:
+    """
+    Build the shared splitter once. Chunks are measured in tokens of the embedding
+    model's tokenizer, so they line up with its max sequence length without
+    embedding more overlap than needed. Built lazily so worker processes that
+    only partition files never load the tokenizer.
+    """
+    separators = ["\n\n", "\n", " ", ""]
+    
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(config.SPLITTER_TOKENIZER)
+    except Exception as e:
+        logger.warning(f"Tokenizer unavailable, falling back to character-based chunking: {str(e)}")
+        return FastSplitter(
+            chunk_size=1000,  # Smaller chunks for better retrieval
+            chunk_overlap=200,  # More overlap for context preservation
+            length_function=len,
+            separators=separators
+        )
+    
+    # CHUNK_SIZE is the full model input, so leave room for [CLS]/[SEP]
+    return FastSplitter.from_huggingface_tokenizer(
+        tokenizer,
+        chunk_size=config.CHUNK_SIZE - tokenizer.num_special_tokens_to_add(),
+        chunk_overlap=config.CHUNK_OVERLAP,
+        separators=separators
+    )
+
+# Read directly instead of going through unstructured
+PLAIN_TEXT_EXTENSIONS = frozenset({'.txt', '.md'})
+
+# PDFs with less extracted text than this are treated as scanned images
+MIN_PDF_TEXT_LENGTH = 50
+
+def extract_text(file_path: Path) -> str:
+    """
+    Extract the text of a document, using the cheapest reader that works.
+    Plain text is read directly and PDFs with a text layer go through pypdf;
+    everything else, including image-only PDFs, is partitioned by unstructured.
+    """
+    ext = file_path.suffix.lower()
+    
+    if ext in PLAIN_TEXT_EXTENSIONS:
+        return file_path.read_text(encoding="utf-8", errors="replace")
+    
+    if ext == ".pdf":
+        try:
+            text = "\n\n".join(page.extract_text() or "" for page in PdfReader(str(file_path)).pages)
+            if len(text.strip()) >= MIN_PDF_TEXT_LENGTH:
+                return text
+        except Exception as e:
+            logger.warning(f"pypdf could not read {file_path.name}, falling back to unstructured: {str(e)}")
+        
+        # No usable text layer; never pick the slow hi_res strategy implicitly
+        elements = partition(filename=str(file_path), strategy=config.PDF_FALLBACK_STRATEGY)
+    else:
+        # Use unstructured to partition the document
+        elements = partition(filename=str(file_path))
+    
+    # Convert elements to text
+    return "\n\n".join(map(str, elements))
+
+def content_digest(text: str) -> str:
+    """Hash of a chunk's text; identical chunks from different files share it."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def load_document(file_path: Path, file_size: Optional[int] = None, last_modified: Optional[float] = None) -> List[Document]:
+    """
+    Load and process a single document.
+    Returns a list of LangChain Document objects.
+    Defined at module level so it can be pickled into worker processes.
+    Pass file_size/last_modified from an existing stat to avoid re-statting the file.
+    """
+    logger.info(f"Processing file: {file_path.name}")
+    
+    try:
+        if file_size is None or last_modified is None:
+            stat = file_path.stat()
+            file_size, last_modified = stat.st_size, stat.st_mtime
+        
+        text_content = extract_text(file_path)
+        
+        # Create LangChain Document with metadata
+        document = Document(
+            page_content=text_content,
+            metadata={
+                "source": str(file_path),
+                "filename": file_path.name,
+                "file_type": file_path.suffix.lower(),
+                "file_size": file_size,
+                "last_modified": last_modified
+            }
+        )
+        
+        return [document]
+        
+    except Exception as e:
+        logger.error(f"Error loading document {file_path}: {str(e)}")
+        return []
+
 class DocumentEmbedder:
     """
     Handles document processing and embedding for RAG pipeline.
     Reads files from a specified directory and creates embeddings.
     """
     
+    supported_extensions = SUPPORTED_EXTENSIONS
+    
     def __init__(self, config):
         self.config = config
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,  # Smaller chunks for better retrieval
-            chunk_overlap=200,  # More overlap for context preservation
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        self.embedding = get_embedding()
+        
+        # Tracks (size, mtime) and chunk ids per ingested file so unchanged files can be skipped
+        self.manifest_path = self.get_manifest_path()
+        self.manifest = self.load_manifest()
+        # Entries indexed but not yet persisted; recorded once the vector store is saved
+        self.pending_entries = {}
         
-        # Supported file extensions by unstructured
-        self.supported_extensions = {
-            '.pdf', '.docx', '.doc', '.txt', '.md', '.html', '.htm',
-            '.rtf', '.odt', '.csv', '.xlsx', '.xls', '.pptx', '.ppt'
-        }
+        # Serializes writes to the vector store and manifest; FAISS indexes are not thread-safe
+        self.write_lock = threading.Lock()
+        
+        # Partitioning pool shared by every ingest, created on first use
+        self.executor = None
+        self.executor_lock = threading.Lock()
+        
+        # get_file_stats results per directory, as (computed_at, directory mtime, stats)
+        self.stats_cache = {}
+        
+        self.text_splitter = get_text_splitter()
     
     def is_supported_file(self, file_path: Path) -> bool:
         """Check if file extension is supported by unstructured."""
         return file_path.suffix.lower() in self.supported_extensions
     
+    def get_manifest_path(self) -> Path:
+        """Locate the manifest for the configured store, so each store and collection tracks its own files."""
+        if self.config.VECTOR_BACKEND == "faiss":
+            return Path(self.config.FAISS_PATH) / "ingest_manifest.json"
+        
+        name = self.config.DEFAULT_COLLECTION
+        if self.config.CHROMA_MODE == "server":
+            name = f"{self.config.CHROMA_HOST}_{self.config.CHROMA_PORT}_{name}"
+        return Path(self.config.CHROMA_PATH) / f"ingest_manifest_{name}.json"
+    
+    def load_manifest(self) -> dict:
+        """Load the ingest manifest, returning an empty one if missing or unreadable."""
+        if not self.manifest_path.exists():
+            return {}
+        
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read ingest manifest {self.manifest_path}: {str(e)}")
+            return {}
+    
+    def save_manifest(self) -> None:
+        """Write the ingest manifest atomically."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def is_unchanged(self, file_path: Path, stat: Optional[os.stat_result] = None) -> bool:
+        """Check whether a file's size and mtime match its last ingested signature."""
+        entry = self.manifest.get(str(file_path))
+        if not entry:
+            return False
+        
+        if stat is None:
+            stat = file_path.stat()
+        return entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+    
     def load_document(self, file_path: Path) -> List[Document]:
+        """Load a single document. See the module-level load_document."""
+        return load_document(file_path)
+    
+    def chunk_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
         """
-        Load and process a single document using unstructured.
-        Returns a list of LangChain Document objects.
+        Split documents into smaller chunks for better retrieval.
+        Yields chunks one document at a time so full texts can be dropped as soon as they are split.
+        Chunk ids are a hash of the chunk text, so duplicate content gets duplicate ids
+        however the splitter is configured.
         """
-        try:
-            # Use unstructured to partition the document
-            elements = partition(filename=str(file_path))
-            
-            # Convert elements to text
-            text_content = "\n\n".join([str(element) for element in elements])
-            
-            # Create LangChain Document with metadata
-            document = Document(
-                page_content=text_content,
-                metadata={
-                    "source": str(file_path),
-                    "filename": file_path.name,
-                    "file_type": file_path.suffix.lower(),
-                    "file_size": file_path.stat().st_size,
-                    "last_modified": file_path.stat().st_mtime
-                }
-            )
-            
-            return [document]
-            
-        except Exception as e:
-            logger.error(f"Error loading document {file_path}: {str(e)}")
-            return []
+        for document in documents:
+            try:
+                for chunk in self.text_splitter.split_documents([document]):
+                    chunk.id = content_digest(chunk.page_content)
+                    yield chunk
+            except Exception as e:
+                logger.error(f"Error chunking document {document.metadata.get('source')}: {str(e)}")
     
-    def chunk_documents(self, documents: List[Document]) -> List[Document]:
-        """Split documents into smaller chunks for better retrieval."""
+    def get_executor(self):
+        """Return the shared partitioning pool, creating it on first use."""
+        with self.executor_lock:
+            if self.executor is None:
+                workers = self.config.INGEST_WORKERS
+                if self.config.INGEST_EXECUTOR == "thread":
+                    self.executor = ThreadPoolExecutor(max_workers=workers)
+                else:
+                    # Spawned workers don't inherit locks held by the server's other threads, as forked ones would
+                    self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+    
+    def discard_executor(self, executor) -> None:
+        """Drop a broken pool so the next ingest starts a fresh one."""
+        with self.executor_lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def close(self) -> None:
+        """Shut down the partitioning pool."""
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+    
+    def load_documents(self, files: List[Path], sizes: List[int], mtimes: List[float]) -> Iterator[Document]:
+        """
+        Partition files in parallel and yield their documents in order.
+        Only a small window of files is in flight at once, keeping memory bounded.
+        """
+        # Partitioning is CPU-bound and dominates ingest time
+        executor = self.get_executor()
+        workers = self.config.INGEST_WORKERS
+        logger.info(f"Processing {len(files)} files with {workers} workers")
+        
+        processed_files = 0
+        pending = deque()
         try:
-            chunks = self.text_splitter.split_documents(documents)
-            logger.info(f"Created {len(chunks)} chunks from {len(documents)} documents")
-            return chunks
-        except Exception as e:
-            logger.error(f"Error chunking documents: {str(e)}")
-            return []
+            for args in zip(files, sizes, mtimes):
+                pending.append(executor.submit(load_document, *args))
+                
+                if len(pending) >= workers * 2:
+                    documents = pending.popleft().result()
+                    processed_files += bool(documents)
+                    yield from documents
+            
+            while pending:
+                documents = pending.popleft().result()
+                processed_files += bool(documents)
+                yield from documents
+        except BrokenProcessPool as e:
+            # A worker died (e.g. a crash in unstructured or an OOM kill); the remaining files
+            # get no manifest entry, so they are retried on the next ingest
+            logger.error(f"Partitioning pool broke, skipping the rest of this batch: {str(e)}")
+            self.discard_executor(executor)
+        
+        logger.info(f"Processed {processed_files} files")
     
-    def process_directory(self, directory_path: Optional[str] = None) -> List[Document]:
+    def process_directory(self, directory_path: Optional[str] = None, stats: Optional[dict] = None) -> Iterator[Document]:
         """
         Process all supported files in the specified directory.
-        Returns a list of chunked documents ready for embedding.
+        Yields each changed file's document as soon as it is partitioned.
+        If a stats dict is given, it is filled with get_file_stats-style counts
+        from the same directory walk.
         """
         if directory_path is None:
             directory_path = self.config.NEXTCLOUD_PATH
@@ -87,66 +412,220 @@ class DocumentEmbedder:
         
         if not dir_path.exists():
             logger.error(f"Directory does not exist: {directory_path}")
-            return []
+            if stats is not None:
+                stats["error"] = "Directory does not exist"
+            return
         
         if not dir_path.is_dir():
             logger.error(f"Path is not a directory: {directory_path}")
-            return []
+            if stats is not None:
+                stats["error"] = "Path is not a directory"
+            return
         
-        all_documents = []
-        processed_files = 0
+        # Recursively find all supported files, statting each one only once
+        files, sizes, mtimes = [], [], []
+        skipped_files = 0
+        dir_mtime = dir_path.stat().st_mtime
         
-        # Recursively find all supported files
-        for file_path in dir_path.rglob('*'):
-            if file_path.is_file() and self.is_supported_file(file_path):
-                logger.info(f"Processing file: {file_path.name}")
-                
-                documents = self.load_document(file_path)
-                if documents:
-                    all_documents.extend(documents)
-                    processed_files += 1
+        for entry in iter_files(str(dir_path)):
+            ext = get_extension(entry.name)
+            supported = ext in self.supported_extensions
+            
+            # Without stats to collect, reject unsupported files before any stat call
+            if not supported and stats is None:
+                continue
+            
+            stat = entry.stat()
+            if stats is not None:
+                count_file(stats, ext, stat)
+            
+            if not supported:
+                continue
+            
+            file_path = Path(entry.path)
+            
+            # Skip files that haven't changed since they were last ingested
+            if self.is_unchanged(file_path, stat):
+                skipped_files += 1
+                continue
+            
+            files.append(file_path)
+            sizes.append(stat.st_size)
+            mtimes.append(stat.st_mtime)
         
-        logger.info(f"Processed {processed_files} files, loaded {len(all_documents)} documents")
+        if skipped_files:
+            logger.info(f"Skipping {skipped_files} unchanged files")
         
-        # Chunk all documents
-        if all_documents:
-            chunked_documents = self.chunk_documents(all_documents)
-            return chunked_documents
+        if stats is not None:
+            stats["skipped_files"] = skipped_files
+            
+            # The walk already produced fresh stats, so get_file_stats can reuse them
+            file_stats = {key: stats[key] for key in empty_file_stats()}
+            self.stats_cache[str(dir_path)] = (time.monotonic(), dir_mtime, file_stats)
         
-        return []
+        yield from self.load_documents(files, sizes, mtimes)
+    
+    def embed_files(self, db, file_paths: List[Path]) -> int:
+        """
+        Partition a batch of files in parallel and index them with shared embedding calls.
+        Files are partitioned before taking write_lock, so concurrent callers only wait on indexing.
+        Returns the number of chunks embedded.
+        """
+        files, sizes, mtimes = [], [], []
+        for file_path in file_paths:
+            # A file removed after its webhook fired shouldn't fail the rest of the batch
+            try:
+                stat = file_path.stat()
+            except OSError as e:
+                logger.warning(f"Skipping {file_path}: {str(e)}")
+                continue
+            files.append(file_path)
+            sizes.append(stat.st_size)
+            mtimes.append(stat.st_mtime)
+        
+        documents = list(self.load_documents(files, sizes, mtimes))
+        
+        with self.write_lock:
+            return self.index_documents(db, documents)
     
-    def embed_documents(self, directory_path: Optional[str] = None) -> bool:
+    def embed_documents(self, directory_path: Optional[str] = None) -> Tuple[bool, dict]:
         """
         Main method to process directory and add documents to vector database.
-        Returns True if successful, False otherwise.
+        Returns (success, stats), where stats holds the get_file_stats counts
+        gathered during the same directory walk plus skipped_files and indexed_chunks.
         """
+        stats = empty_file_stats()
+        
         try:
-            # Process documents from directory
-            chunks = self.process_directory(directory_path)
-            
-            if not chunks:
-                logger.warning("No documents found to embed")
-                return False
-            
-            # Get vector database and add documents
+            # Get vector database and stream documents from the directory into it
             db = get_vector_db()
-            db.add_documents(chunks)
+            with self.write_lock:
+                total_chunks = self.index_documents(db, self.process_directory(directory_path, stats))
+                stats["indexed_chunks"] = total_chunks
+                
+                # Persist the database, along with files that produced no chunks
+                if self.pending_entries:
+                    self.persist(db)
             
-            # Persist the database (if using ChromaDB)
-            if hasattr(db, 'persist'):
-                db.persist()
+            if not total_chunks:
+                # Nothing new to embed is a success when the corpus is already indexed
+                if stats.get("skipped_files"):
+                    logger.info(f"All {stats['skipped_files']} documents are up to date")
+                    return True, stats
+                
+                logger.warning("No documents found to embed")
+                return False, stats
             
-            logger.info(f"Successfully embedded {len(chunks)} document chunks")
-            return True
+            logger.info(f"Successfully indexed {total_chunks} document chunks")
+            return True, stats
             
         except Exception as e:
             logger.error(f"Error in embedding process: {str(e)}")
-            return False
+            return False, stats
+    
+    def index_documents(self, db, documents: Iterable[Document]) -> int:
+        """
+        Chunk a stream of documents and embed the chunks in fixed-size batches.
+        Each batch is dropped once written, so the corpus is never held in memory at once.
+        Replaces chunks from previous versions of each file and records every loaded file,
+        including ones with no chunks, for the manifest.
+        Callers must hold write_lock.
+        Returns the number of chunks indexed, including ones whose content was already stored.
+        """
+        entries = {}
+        stale_ids = set()
+        batch = []
+        total_chunks = 0
+        
+        # Files indexed by an earlier call but not yet persisted count as already ingested
+        known = {**self.manifest, **self.pending_entries}
+        
+        for document in documents:
+            source = document.metadata["source"]
+            
+            # Chunks from the file's previous version are candidates for removal once the new ones are written
+            stale_ids.update(known.get(source, {}).get("ids", []))
+            
+            # Files without text (empty, or scanned PDFs) are recorded too, so they aren't re-read every run
+            entries[source] = {
+                "size": document.metadata["file_size"],
+                "mtime": document.metadata["last_modified"],
+                "ids": []
+            }
+            
+            for chunk in self.chunk_documents([document]):
+                batch.append(chunk)
+                
+                if len(batch) >= self.config.EMBED_BATCH_SIZE:
+                    total_chunks += self.add_chunks(db, batch, entries)
+                    batch.clear()
+        
+        if batch:
+            total_chunks += self.add_chunks(db, batch, entries)
+        
+        # Keep chunks that a new version or any other file still uses
+        if stale_ids:
+            referenced = {chunk_id for entry in entries.values() for chunk_id in entry["ids"]}
+            for source, entry in known.items():
+                if source not in entries:
+                    referenced.update(entry["ids"])
+            stale_ids -= referenced
+        
+        if stale_ids:
+            delete_ids(db, list(stale_ids))
+            logger.info(f"Removed {len(stale_ids)} stale chunks")
+        
+        # Record the new signature and chunk ids for each ingested file once the store is persisted
+        self.pending_entries.update(entries)
+        
+        return total_chunks
+    
+    def persist(self, db) -> None:
+        """
+        Save the vector store, then the manifest entries indexed since the last save.
+        The manifest never lists files whose vectors haven't reached disk.
+        Callers must hold write_lock.
+        """
+        persist_vector_db(db)
+        
+        if self.pending_entries:
+            self.manifest.update(self.pending_entries)
+            self.pending_entries.clear()
+            self.save_manifest()
+    
+    def add_chunks(self, db, chunks: List[Document], entries: dict) -> int:
+        """
+        Embed one batch of chunks with a single embedding call and write the precomputed vectors.
+        Chunks whose content-derived id is already stored are not embedded again.
+        Chunk ids are appended to each chunk's manifest entry.
+        """
+        for chunk in chunks:
+            entries[chunk.metadata["source"]]["ids"].append(chunk.id)
+        
+        # Skip content that is already stored, or repeated within this batch
+        seen = {doc.id for doc in db.get_by_ids([chunk.id for chunk in chunks])}
+        new_chunks = []
+        for chunk in chunks:
+            if chunk.id not in seen:
+                seen.add(chunk.id)
+                new_chunks.append(chunk)
+        
+        if new_chunks:
+            texts = [chunk.page_content for chunk in new_chunks]
+            metadatas = [chunk.metadata for chunk in new_chunks]
+            ids = [chunk.id for chunk in new_chunks]
+            
+            vectors = self.embedding.embed_documents(texts)
+            add_embeddings(db, ids, texts, vectors, metadatas)
+        
+        logger.info(f"Embedded batch of {len(new_chunks)} chunks ({len(chunks) - len(new_chunks)} already stored)")
+        return len(chunks)
     
     def get_file_stats(self, directory_path: Optional[str] = None) -> dict:
         """
         Get statistics about files in the directory.
         Useful for monitoring and debugging.
+        Results are cached for STATS_CACHE_TTL seconds, or until the directory's mtime changes.
         """
         if directory_path is None:
             directory_path = self.config.NEXTCLOUD_PATH
@@ -156,21 +635,16 @@ class DocumentEmbedder:
         if not dir_path.exists():
             return {"error": "Directory does not exist"}
         
-        stats = {
-            "total_files": 0,
-            "supported_files": 0,
-            "file_types": {},
-            "total_size": 0
-        }
-        
-        for file_path in dir_path.rglob('*'):
-            if file_path.is_file():
-                stats["total_files"] += 1
-                stats["total_size"] += file_path.stat().st_size
-                
-                if self.is_supported_file(file_path):
-                    stats["supported_files"] += 1
-                    ext = file_path.suffix.lower()
-                    stats["file_types"][ext] = stats["file_types"].get(ext, 0) + 1
+        dir_mtime = dir_path.stat().st_mtime
+        cached = self.stats_cache.get(str(dir_path))
+        if cached:
+            computed_at, cached_mtime, cached_stats = cached
+            if cached_mtime == dir_mtime and time.monotonic() - computed_at < self.config.STATS_CACHE_TTL:
+                return cached_stats
+        
+        stats = empty_file_stats()
+        for entry in iter_files(str(dir_path)):
+            count_file(stats, get_extension(entry.name), entry.stat())
         
+        self.stats_cache[str(dir_path)] = (time.monotonic(), dir_mtime, stats)
         return stats
\ No newline at end of file
@@ -1,19 +1,229 @@
 import os
+from functools import lru_cache
+from pathlib import Path
+import chromadb
 from src.config import Config
 # from langchain_community.embeddings import OllamaEmbeddings
 # from langchain_community.vectorstores.chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
 from langchain_chroma import Chroma
+from src.local_embeddings import LocalMiniLMEmbeddings, LocalOllamaEmbeddings
+from src.rerank import FullPrecisionStore
 
 config= Config()
 
+# Embeddings are L2-normalized at the source so every store can use the inner-product metric
+@lru_cache(maxsize=1)
+def get_embedding():
+    if config.EMBED_BACKEND == "onnx":
+        return LocalMiniLMEmbeddings(
+            model_name=config.ONNX_MODEL,
+            model_path=config.ONNX_MODEL_PATH,
+            batch_size=config.EMBED_BATCH_SIZE
+        )
+
+    return LocalOllamaEmbeddings(
+        model=config.EMBEDDING_MODEL,
+        base_url=config.OLLAMA_BASE_URL,
+        concurrency=config.EMBED_CONCURRENCY
+    )
+
+# index_factory encodings for each QUANTIZE setting
+QUANTIZE_ENCODINGS = {
+    "none": "Flat",
+    "sq8": "SQ8",
+    "pq48": "PQ48x8",
+}
+
+def get_faiss_index_string():
+    if config.FAISS_INDEX:
+        return config.FAISS_INDEX
+
+    # Unquantized vectors are searched exactly
+    if config.QUANTIZE == "none":
+        return "Flat"
+
+    return f"IVF{config.FAISS_NLIST},{QUANTIZE_ENCODINGS[config.QUANTIZE]}"
+
+def build_faiss_index():
+    import faiss
+
+    index = faiss.index_factory(config.EMBEDDING_DIM, get_faiss_index_string(), faiss.METRIC_INNER_PRODUCT)
+    set_nprobe(index)
+    return index
+
+@lru_cache(maxsize=1)
+def get_faiss_train_size():
+    """Vectors to collect before training the configured index, or 0 if it needs no training."""
+    import faiss
+
+    index = build_faiss_index()
+    if index.is_trained:
+        return 0
+
+    # k-means needs at least one point per centroid, and FAISS asks for ~39 per centroid
+    centroids = 0
+    try:
+        ivf = faiss.downcast_index(faiss.extract_index_ivf(index))
+        centroids = ivf.nlist
+        if hasattr(ivf, "pq"):
+            centroids = max(centroids, ivf.pq.ksub)
+    except RuntimeError:
+        pass
+    return max(config.FAISS_TRAIN_SIZE, 39 * centroids)
+
+def keeps_full_precision():
+    # Any FAISS index but Flat is approximate, and most can't return or remove vectors exactly
+    return config.VECTOR_BACKEND == "faiss" and get_faiss_index_string() != "Flat"
+
+# float32 copies of approximately indexed vectors, used to re-rank the top candidates exactly
+# and to rebuild the index after deletes
+@lru_cache(maxsize=1)
+def get_full_precision_store():
+    return FullPrecisionStore(config.FAISS_PATH, config.EMBEDDING_DIM)
+
+def set_nprobe(index):
+    import faiss
+
+    # Only IVF indexes have lists to probe
+    try:
+        faiss.extract_index_ivf(index).nprobe = config.FAISS_NPROBE
+    except RuntimeError:
+        pass
+
+def get_faiss_db(embedding):
+    # FAISS is optional: pip install faiss-cpu langchain-community
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    if (Path(config.FAISS_PATH) / "index.faiss").exists():
+        db = FAISS.load_local(
+            config.FAISS_PATH,
+            embedding,
+            allow_dangerous_deserialization=True,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+        set_nprobe(db.index)
+        return db
+
+    # Indexes that need training start as an exact flat index until enough vectors arrive
+    if get_faiss_train_size():
+        index = faiss.IndexFlatIP(config.EMBEDDING_DIM)
+    else:
+        index = build_faiss_index()
+
+    return FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+
+# Cached so callers share one client instead of reopening the store on every request
+@lru_cache(maxsize=1)
 def get_vector_db():
-    embedding = OllamaEmbeddings(model=config.EMBEDDING_MODEL)
+    embedding = get_embedding()
+
+    if config.VECTOR_BACKEND == "faiss":
+        return get_faiss_db(embedding)
+
+    # Server mode lets several processes write concurrently instead of contending on the local store
+    if config.CHROMA_MODE == "server":
+        client = chromadb.HttpClient(host=config.CHROMA_HOST, port=config.CHROMA_PORT)
+        storage = {"client": client}
+    else:
+        storage = {"persist_directory": config.CHROMA_PATH}
 
     db = Chroma(
         collection_name=config.DEFAULT_COLLECTION,
-        persist_directory=config.CHROMA_PATH,
-        embedding_function=embedding
+        embedding_function=embedding,
+        # Only applies when the collection is first created
+        collection_metadata={"hnsw:space": "ip"},
+        **storage
     )
 
-    return db
\ No newline at end of file
+    return db
+
+def build_filled_faiss_index(vectors):
+    """Build the configured index holding vectors, or a flat staging index if there are too few to train it."""
+    import faiss
+
+    train_size = get_faiss_train_size()
+    if train_size and len(vectors) < train_size:
+        index = faiss.IndexFlatIP(config.EMBEDDING_DIM)
+    else:
+        index = build_faiss_index()
+        if not index.is_trained:
+            index.train(vectors)
+
+    index.add(vectors)
+    return index
+
+def train_faiss_index(db):
+    """Swap a flat staging index for the configured IVF/PQ index once enough vectors are stored."""
+    import faiss
+
+    train_size = get_faiss_train_size()
+    if not train_size or not isinstance(db.index, faiss.IndexFlat) or db.index.ntotal < train_size:
+        return
+
+    # Rows keep their positions, so index_to_docstore_id stays valid
+    db.index = build_filled_faiss_index(db.index.reconstruct_n(0, db.index.ntotal))
+
+def add_embeddings(db, ids, texts, embeddings, metadatas):
+    """Write precomputed embeddings to whichever vector store is configured."""
+    if isinstance(db, Chroma):
+        db._collection.add(
+            ids=ids,
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=metadatas
+        )
+        return
+
+    db.add_embeddings(zip(texts, embeddings), metadatas=metadatas, ids=ids)
+
+    if keeps_full_precision():
+        get_full_precision_store().add(ids, embeddings)
+
+    train_faiss_index(db)
+
+def delete_ids(db, ids):
+    """Delete ids from the vector store, ignoring ones that are already gone."""
+    if isinstance(db, Chroma):
+        db.delete(ids=ids)
+        return
+
+    import faiss
+
+    # FAISS.delete raises on ids it does not hold
+    stored = set(db.index_to_docstore_id.values())
+    ids = [i for i in ids if i in stored]
+    if not ids:
+        return
+
+    # FAISS.delete renumbers positions to 0..n-1, which only matches flat indexes
+    if isinstance(db.index, faiss.IndexFlat):
+        db.delete(ids=ids)
+        return
+
+    # IVF/PQ keep their old labels after remove_ids and HNSW can't remove at all,
+    # so rebuild from the float32 copies of the remaining vectors
+    removed = set(ids)
+    keep = [doc_id for _, doc_id in sorted(db.index_to_docstore_id.items()) if doc_id not in removed]
+    vectors = get_full_precision_store().get(keep).reshape(-1, config.EMBEDDING_DIM)
+
+    db.index = build_filled_faiss_index(vectors)
+    db.index_to_docstore_id = dict(enumerate(keep))
+    db.docstore.delete(ids)
+
+def persist_vector_db(db):
+    # Chroma persists automatically; FAISS lives in memory until saved
+    if isinstance(db, Chroma):
+        if hasattr(db, 'persist'):
+            db.persist()
+        return
+
+    db.save_local(config.FAISS_PATH)
\ No newline at end of file
@@ -1,14 +1,49 @@
 import os
+import logging
+import httpx
 from src.config import Config
 from langchain_ollama import ChatOllama
 from langchain.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain.retrievers.multi_query import MultiQueryRetriever
-from src.get_vector_db import get_vector_db
+from src.get_vector_db import get_full_precision_store, get_vector_db, keeps_full_precision
+from src.rerank import RerankRetriever
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 config= Config()
 
+# Candidates re-ranked for approximate FAISS indexes when RERANK_FETCH_K is unset
+DEFAULT_FETCH_K = 100
+
+# Chat model client; warm_up pins the model on the same server that query() talks to
+def get_llm():
+    return ChatOllama(model=config.OLLAMA_MODEL, base_url=config.OLLAMA_BASE_URL, extract_reasoning=False)
+
+# Ollama loads models lazily, so fire one request at startup instead of on the first query
+def warm_up():
+    try:
+        get_vector_db().embeddings.embed_query("warmup")
+        logger.info("Embedding model warmed up")
+    except Exception as e:
+        logger.warning(f"Embedding warm-up failed: {str(e)}")
+
+    try:
+        llm = get_llm()
+        # An empty prompt loads the model; keep_alive=-1 keeps it resident
+        response = httpx.post(
+            f"{llm.base_url.rstrip('/')}/api/generate",
+            json={"model": llm.model, "keep_alive": -1, "prompt": ""},
+            timeout=120.0
+        )
+        response.raise_for_status()
+        logger.info(f"Loaded {config.OLLAMA_MODEL} into Ollama")
+    except Exception as e:
+        logger.warning(f"LLM warm-up failed: {str(e)}")
+
 # Function to get the prompt templates for generating alternative questions and answering based on context
 def get_prompt():
     QUERY_PROMPT = PromptTemplate(
@@ -34,15 +69,23 @@ def get_prompt():
 def query(input):
     if input:
         # Initialize the language model with the specified model name
-        llm = ChatOllama(model=config.OLLAMA_MODEL, extract_reasoning=False)
+        llm = get_llm()
         # Get the vector database instance
         db = get_vector_db()
         # Get the prompt templates
         QUERY_PROMPT, prompt = get_prompt()
 
+        # Over-fetch candidates and re-rank them exactly before they reach the LLM;
+        # always done for approximate FAISS indexes, whose own scores are only estimates
+        store = get_full_precision_store() if keeps_full_precision() else None
+        if config.RERANK_FETCH_K > 0 or store is not None:
+            base_retriever = RerankRetriever(db=db, store=store, fetch_k=config.RERANK_FETCH_K or DEFAULT_FETCH_K)
+        else:
+            base_retriever = db.as_retriever()
+
         # Set up the retriever to generate multiple queries using the language model and the query prompt
         retriever = MultiQueryRetriever.from_llm(
-            db.as_retriever(), 
+            base_retriever, 
             llm,
             prompt=QUERY_PROMPT
         )
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import List
+import httpx
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+def l2_normalize(vectors) -> np.ndarray:
+    """Scale vectors to unit length so cosine similarity becomes a plain dot product."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+def export_quantized_model(model_name: str, save_dir: Path) -> None:
+    """
+    Export a sentence-transformers model to ONNX and quantize it to int8.
+    Only needs to run once; the result is reused from save_dir afterwards.
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    logger.info(f"Exporting {model_name} to ONNX and quantizing to int8 in {save_dir}")
+
+    model = ORTModelForFeatureExtraction.from_pretrained(
+        model_name, export=True, provider="CPUExecutionProvider"
+    )
+    model.save_pretrained(save_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(save_dir)
+
+    quantizer = ORTQuantizer.from_pretrained(model)
+    quantization_config = AutoQuantizationConfig.avx2(is_static=False, per_channel=True)
+    quantizer.quantize(save_dir=save_dir, quantization_config=quantization_config)
+
+class LocalMiniLMEmbeddings(Embeddings):
+    """
+    In-process MiniLM embeddings using an int8-quantized ONNX model.
+    Avoids the HTTP round-trip to Ollama for every embedding request.
+    """
+
+    def __init__(self, model_name: str, model_path: str, batch_size: int = 64):
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "EMBED_BACKEND=onnx requires optimum: pip install 'optimum[onnxruntime]'"
+            ) from e
+
+        save_dir = Path(model_path)
+        if not (save_dir / QUANTIZED_FILE_NAME).exists():
+            export_quantized_model(model_name, save_dir)
+
+        self.batch_size = batch_size
+        self.tokenizer = AutoTokenizer.from_pretrained(save_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            save_dir, file_name=QUANTIZED_FILE_NAME, provider="CPUExecutionProvider"
+        )
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Run the model and mean-pool token embeddings over the attention mask."""
+        inputs = self.tokenizer(texts, padding=True, truncation=True, return_tensors="np")
+        token_embeddings = self.model(**inputs).last_hidden_state
+
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return l2_normalize(summed / counts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[i:i + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+class LocalOllamaEmbeddings(Embeddings):
+    """
+    Ollama embeddings that keep several requests in flight at once.
+    Texts are split into small batches and posted concurrently to /api/embed,
+    so the model server is never left idle between calls.
+    All requests go through one pooled httpx.AsyncClient, owned by a background
+    event loop so sync and async callers can share its connections.
+    """
+
+    def __init__(self, model: str, base_url: str, concurrency: int = 8, request_size: int = 16):
+        self.model = model
+        self.url = f"{base_url.rstrip('/')}/api/embed"
+        self.concurrency = concurrency
+        self.request_size = request_size
+        self.timeout = httpx.Timeout(120.0)
+        self.loop = None
+        self.client = None
+        self.lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the event loop that owns the shared client, on first use."""
+        with self.lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ollama-embeddings", daemon=True).start()
+                self.client = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.concurrency),
+                    timeout=self.timeout
+                )
+                self.loop = loop
+            return self.loop
+
+    def _submit(self, texts: List[str]):
+        return asyncio.run_coroutine_threadsafe(self._aembed(texts), self._get_loop())
+
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def post(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                response = await self.client.post(self.url, json={"model": self.model, "input": batch})
+                response.raise_for_status()
+                return response.json()["embeddings"]
+
+        # gather preserves request order, so vectors line up with texts
+        results = await asyncio.gather(*[
+            post(texts[i:i + self.request_size])
+            for i in range(0, len(texts), self.request_size)
+        ])
+
+        return l2_normalize([vector for batch in results for vector in batch]).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._submit(texts).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._submit([text]).result()[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return await asyncio.wrap_future(self._submit(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await asyncio.wrap_future(self._submit([text])))[0]
@@ -0,0 +1,145 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Any, List, Optional
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba is optional; without it scoring falls back to a numpy matrix-vector product
+    njit = None
+    prange = range
+
+def _batch_ip(mat, q):
+    """Inner product of every row of mat with q. Equals cosine similarity for normalized vectors."""
+    out = np.empty(mat.shape[0], np.float32)
+    for i in prange(mat.shape[0]):
+        s = 0.0
+        for j in range(mat.shape[1]):
+            s += mat[i, j] * q[j]
+        out[i] = s
+    return out
+
+if njit is not None:
+    batch_ip = njit('f4[:](f4[:,::1], f4[::1])', fastmath=True, parallel=True, cache=True)(_batch_ip)
+else:
+    def batch_ip(mat, q):
+        return mat @ q
+
+def rerank(query_vector, documents: List[Document], vectors, k: int) -> List[Document]:
+    """Exactly rank candidate documents against the query and keep the top k."""
+    if not documents:
+        return []
+
+    mat = np.ascontiguousarray(vectors, dtype=np.float32)
+    q = np.ascontiguousarray(query_vector, dtype=np.float32)
+
+    scores = batch_ip(mat, q)
+    order = np.argsort(-scores)[:k]
+    return [documents[i] for i in order]
+
+class FullPrecisionStore:
+    """
+    Append-only float32 copy of vectors, keyed by document id.
+    Lets a quantized FAISS index re-rank its top candidates at full precision
+    while the index itself only holds compressed codes. Rows for deleted
+    documents are left in place and simply never looked up again.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.dir = Path(path)
+        self.dim = dim
+        self.vectors_path = self.dir / "vectors.f32"
+        self.ids_path = self.dir / "vector_ids.txt"
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.count = 0
+
+        if self.ids_path.exists():
+            with open(self.ids_path, "r") as f:
+                for doc_id in f:
+                    self.rows[doc_id.rstrip("\n")] = self.count
+                    self.count += 1
+
+            # Drop vectors written without their ids (e.g. an interrupted add)
+            if self.vectors_path.exists():
+                row_bytes = self.dim * np.dtype(np.float32).itemsize
+                if self.vectors_path.stat().st_size > self.count * row_bytes:
+                    with open(self.vectors_path, "r+b") as f:
+                        f.truncate(self.count * row_bytes)
+
+    def add(self, ids: List[str], vectors) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+
+        with self.lock:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.ids_path, "a") as f:
+                f.writelines(f"{doc_id}\n" for doc_id in ids)
+
+            for doc_id in ids:
+                self.rows[doc_id] = self.count
+                self.count += 1
+
+    def get(self, ids: List[str]) -> np.ndarray:
+        mat = np.memmap(self.vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dim)
+        return np.asarray(mat[[self.rows[doc_id] for doc_id in ids]])
+
+def _chroma_candidates(db, query_vector, fetch_k: int):
+    """Fetch candidates with the embeddings Chroma keeps alongside them."""
+    results = db._collection.query(
+        query_embeddings=[query_vector],
+        n_results=fetch_k,
+        include=["embeddings", "documents", "metadatas"]
+    )
+    documents = [
+        Document(page_content=text, metadata=metadata or {}, id=doc_id)
+        for doc_id, text, metadata in zip(results["ids"][0], results["documents"][0], results["metadatas"][0])
+    ]
+    return documents, results["embeddings"][0]
+
+def _faiss_candidates(db, query_vector, fetch_k: int, store: FullPrecisionStore):
+    """Search the (possibly quantized) FAISS index, then look up float32 vectors for the hits."""
+    _, indices = db.index.search(np.asarray([query_vector], dtype=np.float32), fetch_k)
+    doc_ids = [db.index_to_docstore_id[i] for i in indices[0] if i != -1]
+
+    documents = [db.docstore.search(doc_id) for doc_id in doc_ids]
+    return documents, store.get(doc_ids)
+
+def rerank_search(db, query: str, k: int = 4, fetch_k: int = 100, store: Optional[FullPrecisionStore] = None) -> List[Document]:
+    """
+    Retrieve fetch_k candidates with the ANN index, then exactly re-rank
+    them on their float32 vectors and return the top k.
+    Chroma keeps float32 vectors itself; quantized FAISS needs a FullPrecisionStore.
+    """
+    query_vector = db.embeddings.embed_query(query)
+
+    if hasattr(db, "_collection"):
+        documents, vectors = _chroma_candidates(db, query_vector, fetch_k)
+    elif store is not None:
+        documents, vectors = _faiss_candidates(db, query_vector, fetch_k, store)
+    else:
+        # An unquantized FAISS index already scores at full precision
+        return db.similarity_search_by_vector(query_vector, k=k)
+
+    return rerank(query_vector, documents, vectors, k)
+
+class RerankRetriever(BaseRetriever):
+    """Retriever that over-fetches from the vector store and exactly re-ranks the candidates."""
+
+    db: Any
+    store: Any = None
+    k: int = 4
+    fetch_k: int = 100
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return rerank_search(self.db, query, k=self.k, fetch_k=self.fetch_k, store=self.store)
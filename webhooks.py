@@ -6,7 +6,7 @@ import os
 import logging
 import asyncio
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from pathlib import Path
 from queue import Queue
@@ -15,6 +15,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 import uuid
@@ -22,6 +23,7 @@ import uuid
 from src.config import Config
 from src.embeddings import DocumentEmbedder
 from src.get_vector_db import get_vector_db
+from src.llm_query import warm_up
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +34,7 @@ config = Config()
 
 # Global variables
 embedder = None
+vector_db = None
 shutdown_event = Event()
 
 # FastAPI app
@@ -44,7 +47,7 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
-    global embedder
+    global embedder, vector_db
     logger.info("Starting webhook service...")
     
     try:
@@ -52,10 +55,83 @@ async def startup_event():
         embedder = DocumentEmbedder(config)
         logger.info("Document embedder initialized")
         
+        # Open the vector database once and reuse it for every request
+        vector_db = get_vector_db()
+        logger.info("Vector database initialized")
+        
+        # Load models now so the first webhook doesn't pay for it
+        await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        
+        # Ingest runs on background workers so webhooks return immediately
+        app.state.queue = asyncio.Queue(maxsize=config.WEBHOOK_QUEUE_SIZE)
+        app.state.workers = [
+            asyncio.create_task(ingest_worker(app.state.queue))
+            for _ in range(config.WEBHOOK_WORKERS)
+        ]
+        logger.info(f"Started {config.WEBHOOK_WORKERS} ingest workers")
+        
     except Exception as e:
         logger.error(f"Failed to initialize webhook service: {str(e)}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event_handler():
+    """Finish queued ingests, then stop the workers"""
+    shutdown_event.set()
+    
+    if not hasattr(app.state, "queue"):
+        return
+    
+    logger.info(f"Draining {app.state.queue.qsize()} queued files...")
+    await app.state.queue.join()
+    
+    for worker in app.state.workers:
+        worker.cancel()
+    await asyncio.gather(*app.state.workers, return_exceptions=True)
+    
+    embedder.close()
+
+async def ingest_worker(queue: asyncio.Queue):
+    """
+    Pull file paths off the queue and ingest them off the event loop.
+    Paths arriving within a short window are ingested together, so a folder
+    sync shares embedding calls and index writes instead of one cycle per file.
+    """
+    loop = asyncio.get_running_loop()
+    flush_seconds = config.WEBHOOK_FLUSH_MS / 1000
+    
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + flush_seconds
+        
+        while len(batch) < config.WEBHOOK_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        try:
+            await loop.run_in_executor(None, ingest_files, batch)
+            logger.info(f"Ingested batch of {len(batch)} files")
+        except Exception as e:
+            logger.error(f"Failed to process batch of {len(batch)} files: {str(e)}")
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+def ingest_files(file_paths: List[str]):
+    """Partition, chunk, embed and store a batch of files. Runs in a worker thread."""
+    total_chunks = embedder.embed_files(vector_db, [Path(file_path) for file_path in file_paths])
+    
+    # Persist even without chunks, so files with no text are recorded
+    with embedder.write_lock:
+        embedder.persist(vector_db)
+    
+    if not total_chunks:
+        raise Exception("Failed to load documents")
 
 def is_supported_file(file_path: str) -> bool:
     """Check if file is supported for processing"""
@@ -110,7 +186,7 @@ def convert_nextcloud_path_to_filesystem(nc_path: str, user_id: str) -> str:
     return os.path.join(base_path, relative_path)
 
 async def handle_file_created(file_path: str):
-    """Process a single newly created file"""
+    """Validate a newly created file and queue it for ingest"""
 
     try:
         file_path_obj = Path(file_path)
@@ -120,18 +196,9 @@ async def handle_file_created(file_path: str):
         if not embedder.is_supported_file(file_path_obj):
             return {"status": "failed","file": f"File type not supported: {file_path_obj.suffix}"}
         
-            
-        documents = embedder.load_document(file_path_obj)
-        
-        if not documents:
-            raise Exception("Failed to load document")
+        await app.state.queue.put(file_path)
         
-        chunks = embedder.chunk_documents(documents)
-
-        db = get_vector_db()
-        db.add_documents(chunks)
-
-        return {"status": "success","file": file_path}
+        return JSONResponse(status_code=202, content={"status": "queued","file": file_path})
     except Exception as e:
         logger.error(f"Failed to process {file_path}: {str(e)}")
         return {"status": "failed","file": f"Failed to process file: {str(e)}"}
\ No newline at end of file